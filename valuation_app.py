@@ -1,79 +1,73 @@
+import copy
+import io
+
 import streamlit as st
-import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
 import matplotlib.patches as patches
 from matplotlib.patches import Polygon
-
-def calculate_scaling_factor(examples):
-    computed_prices = [0.3 * ebit + 0.7 * revenue for ebit, revenue, _ in examples]
-    scale_factors = [price / computed for computed, (_, _, price) in zip(computed_prices, examples)]
-    return sum(scale_factors) / len(scale_factors)
-
-def calculate_price(ebit, revenue, scale_factor):
-    ebit_percentage = (ebit / revenue) * 100
-    ebit_weight, revenue_weight = determine_weights(ebit_percentage)
-    base_price = (ebit_weight * ebit + revenue_weight * revenue) * scale_factor
-
-    price = apply_price_constraints(base_price, ebit, revenue)
-
-    return round(price, 2), ebit_percentage, ebit_weight, revenue_weight, scale_factor
-
-def apply_price_constraints(price, ebit, revenue):
-    price = cap_maximum_price(price)
-    price = enforce_minimum_price(price, ebit, revenue)
-    return price
-
-def cap_maximum_price(price):
-    # Cap the maximum price at 2025
-    return min(price, 2025)
-
-def enforce_minimum_price(price, ebit, revenue):
-    # Minimum EBIT and Revenue
-    min_ebit, min_revenue = 230, 2300
-    ebit_variation = calculate_variation(ebit, min_ebit)
-    revenue_variation = calculate_variation(revenue, min_revenue)
-
-    # Ensure price does not go below 900 unless there's a significant variation
-    if price < 900:
-        if ebit_variation <= 0.15 and revenue_variation <= 0.15:
-            return 900
-        else:
-            return max(300, price)
-
-    return price
-
-def calculate_variation(current, minimum):
-    return abs(current - minimum) / minimum
-
-def determine_weights(ebit_percentage):
-    if ebit_percentage < 3:
-        return 0.9, 0.1
-    elif ebit_percentage < 5:
-        return 0.7, 0.3
-    elif ebit_percentage < 10:
-        return 0.5, 0.5
-    elif ebit_percentage < 30:
-        return 0.3, 0.7
-    elif ebit_percentage < 40:
-        return 0.2, 0.8
-    elif ebit_percentage < 50:
-        return 0.1, 0.9
-    else:
-        return 0.05, 0.95
-
-def plot_data(ebit, revenue, examples, scale_factor):
-    fig, ax = plt.subplots()
-    setup_plot(ax, examples, ebit, revenue)
-    min_zone, ceiling_zone, ebit_ceiling_zone = plot_zones(ax, examples)
+from matplotlib.collections import LineCollection
+
+from valuation_core import calculate_scaling_factor, calculate_price
+
+# Historical deals as (EBIT, Revenue, Price) rows; columns are read as examples[:, i]
+EXAMPLES = np.array([(230, 2300, 900), (350, 3500, 1350), (525, 5250, 2025)])
+
+# Example prices that lie on the Earnout price line
+_EARNOUT_PRICES = frozenset({900, 1350, 2025})
+
+# The examples are fixed, so the scaling factor is computed once at import
+SCALE_FACTOR = calculate_scaling_factor(EXAMPLES)
+
+# Fixed zone geometry and styles as (Revenue, EBIT) vertices; a Patch belongs to one
+# figure, so the Polygons themselves are still created per figure
+_MIN_ZONE_POINTS = np.array([(0, 0), (2200, 0), (2200, 220), (0, 220)])
+_MIN_ZONE_STYLE = {'closed': True, 'linewidth': 1, 'edgecolor': 'lightcoral', 'facecolor': 'lightcoral', 'label': 'Minimum Zone'}
+_CEILING_ZONE_STYLE = {'closed': True, 'linewidth': 1, 'edgecolor': 'skyblue', 'facecolor': 'skyblue', 'label': 'Ceiling Zone'}
+_EARNOUT_AREA_POINTS = np.array([(2300, 230), (2300, 525), (5250, 525)])
+# The selected point is added after the cached skeleton, so the area's zorder keeps its
+# shading on top of the point (and below the lines) as when the point was drawn first
+_EARNOUT_AREA_STYLE = {'closed': True, 'color': 'green', 'alpha': 0.3, 'label': 'Earnout Area', 'zorder': 1.5}
+
+def plot_data(ebit, revenue, examples, price):
+    st.image(render_chart(ebit, revenue, examples, price), use_column_width=True)
+
+@st.cache_data(max_entries=128)
+def render_chart(ebit, revenue, examples, price):
+    # Rasterize once per input combination, with the PNG settings st.pyplot uses; inputs
+    # are free-form, so the cache is bounded. The cached skeleton is copied so it stays
+    # clean across reruns and sessions
+    fig = copy.deepcopy(build_base_figure(examples))
+    ax = fig.axes[0]
+    max_revenue, max_ebit = compute_plot_limits(examples)
+    setup_plot(ax, max(max_revenue, revenue * 1.1), max(max_ebit, ebit * 1.1))
+    plot_price_point(ax, ebit, revenue, price)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+@st.cache_resource
+def build_base_figure(examples):
+    # Everything that depends only on the examples; the selected point is added per call
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    min_zone, ceiling_zone, ebit_ceiling_zone = plot_zones(ax, *compute_plot_limits(examples))
     plot_connections(ax, examples)
-    selected_point = plot_price_point(ax, ebit, revenue, scale_factor)
     Earnout_line = plot_Earnout_lines(ax, examples)
-    Earnout_area = plot_Earnout_area(ax)  # Add this line to draw the earnout area
-    add_legend(ax, min_zone, ceiling_zone, ebit_ceiling_zone, selected_point, Earnout_line, Earnout_area)  # Update the legend
-    st.pyplot(fig)
+    Earnout_area = plot_Earnout_area(ax)
+    add_legend(ax, min_zone, ceiling_zone, ebit_ceiling_zone, Earnout_line, Earnout_area)
+    return fig
+
+def compute_plot_limits(examples):
+    # Revenue and EBIT extents of the examples, with a 10% margin
+    examples = np.asarray(examples, dtype=np.float64)
+    return float(examples[:, 1].max()) * 1.1, float(examples[:, 0].max()) * 1.1
 
-def setup_plot(ax, examples, ebit, revenue):
-    max_revenue = max([ex[1] for ex in examples] + [revenue]) * 1.1
-    max_ebit = max([ex[0] for ex in examples] + [ebit]) * 1.1
+def compute_Earnout_points(examples):
+    mask = np.isin(examples[:, 2], list(_EARNOUT_PRICES))
+    return examples[mask, 1], examples[mask, 0]
+
+def setup_plot(ax, max_revenue, max_ebit):
     ax.set_xlim(0, max_revenue)
     ax.set_ylim(0, max_ebit)
     ax.set_xlabel('Revenue')
@@ -81,56 +75,50 @@ def setup_plot(ax, examples, ebit, revenue):
     ax.set_title('EBIT vs Revenue with Earnout Annotations')
 
 def plot_minimum_zone(ax):
-    # Define the polygon points for the minimum zone, equivalent to the original rectangle
-    points = [(0, 0), (2200, 0), (2200, 220), (0, 220)]
-    min_zone = Polygon(points, closed=True, linewidth=1, edgecolor='lightcoral', facecolor='lightcoral', label='Minimum Zone')
+    min_zone = Polygon(_MIN_ZONE_POINTS, **_MIN_ZONE_STYLE)
     ax.add_patch(min_zone)
     return min_zone
 
 
-def plot_maximum_zones(ax, examples):
-    max_revenue = max(ex[1] for ex in examples) * 1.1
-    max_ebit = max(ex[0] for ex in examples) * 1.1
+def plot_maximum_zones(ax, max_revenue, max_ebit):
     # Polygon for the revenue ceiling zone
     revenue_ceiling_points = [(5300, 0), (max_revenue, 0), (max_revenue, max_ebit), (5300, max_ebit)]
-    ceiling_zone = Polygon(revenue_ceiling_points, closed=True, linewidth=1, edgecolor='skyblue', facecolor='skyblue', label='Ceiling Zone')
+    ceiling_zone = Polygon(revenue_ceiling_points, **_CEILING_ZONE_STYLE)
     ax.add_patch(ceiling_zone)
     # Polygon for the EBIT ceiling zone
     ebit_ceiling_points = [(0, 532), (max_revenue, 532), (max_revenue, max_ebit), (0, max_ebit)]
-    ebit_ceiling_zone = Polygon(ebit_ceiling_points, closed=True, linewidth=1, edgecolor='skyblue', facecolor='skyblue', label='Ceiling Zone')
+    ebit_ceiling_zone = Polygon(ebit_ceiling_points, **_CEILING_ZONE_STYLE)
     ax.add_patch(ebit_ceiling_zone)
     return ceiling_zone, ebit_ceiling_zone
 
-def plot_zones(ax, examples):
+def plot_zones(ax, max_revenue, max_ebit):
     min_zone = plot_minimum_zone(ax)
-    ceiling_zone, ebit_ceiling_zone = plot_maximum_zones(ax, examples)
+    ceiling_zone, ebit_ceiling_zone = plot_maximum_zones(ax, max_revenue, max_ebit)
     return min_zone, ceiling_zone, ebit_ceiling_zone
 
 def plot_Earnout_area(ax):
-    # Points based on the description: (Revenue, EBIT)
-    points = [(2300, 230), (2300, 525), (5250, 525)]
-    earnout_area = Polygon(points, closed=True, color='green', alpha=0.3, label='Earnout Area')
+    earnout_area = Polygon(_EARNOUT_AREA_POINTS, **_EARNOUT_AREA_STYLE)
     ax.add_patch(earnout_area)
     return earnout_area
 
 def plot_connections(ax, examples):
-    for ex_ebit, ex_revenue, ex_price in examples:
-        ax.scatter(ex_revenue, ex_ebit, color='blue')
+    # One scatter and one LineCollection for all examples instead of three artists each
+    ax.scatter(examples[:, 1], examples[:, 0], color='blue')
+    segments = []
+    for ex_ebit, ex_revenue, ex_price in examples.tolist():
         ax.text(ex_revenue, ex_ebit, f'${round(ex_price, 2)}', fontsize=12, ha='right')
-        ax.plot([0, ex_revenue], [ex_ebit, ex_ebit], 'gray', linestyle=':', alpha=0.5)
-        ax.plot([ex_revenue, ex_revenue], [0, ex_ebit], 'gray', linestyle=':', alpha=0.5)
+        segments.append([(0, ex_ebit), (ex_revenue, ex_ebit)])
+        segments.append([(ex_revenue, 0), (ex_revenue, ex_ebit)])
+    ax.add_collection(LineCollection(segments, colors='gray', linestyles=':', alpha=0.5))
 
-def plot_price_point(ax, ebit, revenue, scale_factor):
-    price = calculate_price(ebit, revenue, scale_factor)[0]  
+def plot_price_point(ax, ebit, revenue, price):
     selected_point = ax.scatter(revenue, ebit, color='red', s=50)  
     ax.text(revenue, ebit, f'${price:.2f}', fontsize=12, ha='right', va='bottom') 
     return selected_point
 
 def plot_Earnout_lines(ax, examples):
-    Earnout_prices = {900, 1350, 2025}
-    filtered_xs = [ex[1] for ex in examples if ex[2] in Earnout_prices]
-    filtered_ys = [ex[0] for ex in examples if ex[2] in Earnout_prices]
-    if filtered_xs and filtered_ys:
+    filtered_xs, filtered_ys = compute_Earnout_points(examples)
+    if filtered_xs.size and filtered_ys.size:
         return ax.plot(
             filtered_xs,
             filtered_ys,
@@ -140,8 +128,8 @@ def plot_Earnout_lines(ax, examples):
         )[0]
     return None
 
-def add_legend(ax, min_zone, ceiling_zone, ebit_ceiling_zone, selected_point, Earnout_line, Earnout_area):
-    filtered_elements = [e for e in [min_zone, ceiling_zone, ebit_ceiling_zone, selected_point, Earnout_area] if not e.get_label().startswith('_')]
+def add_legend(ax, min_zone, ceiling_zone, ebit_ceiling_zone, Earnout_line, Earnout_area):
+    filtered_elements = [e for e in [min_zone, ceiling_zone, ebit_ceiling_zone, Earnout_area] if not e.get_label().startswith('_')]
     filtered_labels = [e.get_label() for e in filtered_elements]
     elements = filtered_elements
     labels = filtered_labels
@@ -150,26 +138,30 @@ def add_legend(ax, min_zone, ceiling_zone, ebit_ceiling_zone, selected_point, Ea
         labels.append(Earnout_line.get_label())
     ax.legend(elements, labels, loc='upper center', bbox_to_anchor=(0.5, -0.1), shadow=True, fancybox=True, ncol=3)
 
+def compute_and_plot(ebit, revenue, examples, scale_factor):
+    # The weighting is based on EBIT as a percentage of Revenue, which needs Revenue > 0
+    if revenue <= 0:
+        st.error("Revenue must be greater than zero to calculate a price.")
+        return
+    price, ebit_percentage, ebit_weight, revenue_weight, scale_factor = calculate_price(ebit, revenue, scale_factor)
+    st.write(f"Calculated Company Price: USD'000 {price:.2f}")
+    st.write(f"The price was calculated using a dynamic weighting based on EBIT as a percentage of Revenue ({ebit_percentage:.2f}%).")
+    st.write(f"EBIT weighting used: {ebit_weight:.2f}, Revenue weighting used: {revenue_weight:.2f}.")
+    st.write(f"The scaling factor applied was: {scale_factor:.4f}.")
+    plot_data(ebit, revenue, examples, price)
+
 def main():
     st.title('Earnout Model')
-    examples = [(230, 2300, 900), (350, 3500, 1350), (525, 5250, 2025)]
-    scale_factor = calculate_scaling_factor(examples)
 
     st.sidebar.header('Input Parameters')
     ebit = st.sidebar.number_input("Enter EBIT in USD'000:", value=230)
     revenue = st.sidebar.number_input("Enter Revenue in USD '000:", value=2300)
     if st.sidebar.button('Calculate Price'):
-        price, ebit_percentage, ebit_weight, revenue_weight, scale_factor = calculate_price(ebit, revenue, scale_factor)
-        st.write(f"Calculated Company Price: USD'000 {price:.2f}")
-        st.write(f"The price was calculated using a dynamic weighting based on EBIT as a percentage of Revenue ({ebit_percentage:.2f}%).")
-        st.write(f"EBIT weighting used: {ebit_weight:.2f}, Revenue weighting used: {revenue_weight:.2f}.")
-        st.write(f"The scaling factor applied was: {scale_factor:.4f}.")
-        plot_data(ebit, revenue, examples, scale_factor)
+        compute_and_plot(ebit, revenue, EXAMPLES, SCALE_FACTOR)
         
-    st.sidebar.markdown(model_description())
+    st.sidebar.markdown(MODEL_DESCRIPTION)
 
-def model_description():
-    return """
+MODEL_DESCRIPTION = """
         ## Model Explanation
 
         The company price is USD'000 900 and the eranout potential is for a valuation of USD'000 2025.
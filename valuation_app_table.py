@@ -1,5 +1,20 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+
+from valuation_core import apply_price_constraints, calculate_scaling_factor, determine_weights
+
+# Historical deals as (EBIT, Revenue, Price) rows; columns are read as examples[:, i]
+EXAMPLES = np.array([(230, 2300, 900), (350, 3500, 1350), (780, 5250, 2025)])
+
+# Above 3600 Revenue the weights use a coarser set of EBIT percentage bins
+_HIGH_REVENUE_BOUNDS = np.array([3, 5, 15])
+_HIGH_REVENUE_WEIGHTS = np.array([
+    (0.9, 0.1),
+    (0.7, 0.3),
+    (0.5, 0.5),
+    (0.3, 0.7),
+])
 
 class EarnoutModel:
     def __init__(self, examples):
@@ -7,80 +22,53 @@ class EarnoutModel:
         self.scale_factor = self.calculate_scaling_factor()
 
     def calculate_scaling_factor(self):
-        computed_prices = [0.3 * ebit + 0.7 * revenue for ebit, revenue, _ in self.examples]
-        scale_factors = [price / computed for computed, (_, _, price) in zip(computed_prices, self.examples)]
-        return sum(scale_factors) / len(scale_factors)
+        return calculate_scaling_factor(self.examples)
 
     def calculate_price(self, ebit, revenue):
+        return round(float(self.calculate_price_batch(ebit, revenue)))
+
+    def calculate_prices(self, ebit, revenue):
+        # Rounded prices for several years (or companies) in one batch call
+        return [round(price) for price in self.calculate_price_batch(ebit, revenue).tolist()]
+
+    def calculate_price_batch(self, ebit, revenue):
+        # EBIT and Revenue may be scalars or arrays; the result is an unrounded array of prices
+        ebit = np.asarray(ebit, dtype=np.float64)
+        revenue = np.asarray(revenue, dtype=np.float64)
         ebit_percentage = (ebit / revenue) * 100
         ebit_weight, revenue_weight = self.determine_weights(ebit_percentage, revenue)
         base_price = (ebit_weight * ebit + revenue_weight * revenue) * self.scale_factor
-        price = self.apply_price_constraints(base_price, ebit, revenue)
-        price = self.enforce_price_constraints(price, ebit, revenue)
-        return round(price)
-
-    def apply_price_constraints(self, price, ebit, revenue):
-        min_price = max(300, price)  # Ensure that price does not fall below 300
-        return max(min(price, 2025), min_price)
-
-    def enforce_price_constraints(self, price, ebit, revenue):
-        min_ebit, min_revenue = 230, 2300
-        ebit_variation = self.calculate_variation(ebit, min_ebit)
-        revenue_variation = self.calculate_variation(revenue, min_revenue)
-
-        # Ensure price does not go below 900 unless there's a significant variation
-        if price < 900:
-            if ebit_variation <= 0.15 and revenue_variation <= 0.15:
-                price = 900
-            else:
-                price = max(300, price)
-        # Ensure price does not exceed 2025
-        price = min(price, 2025)
-        
-        return price
-
-    @staticmethod
-    def calculate_variation(current, minimum):
-        return abs(current - minimum) / minimum
+        return apply_price_constraints(base_price, ebit, revenue)
 
     @staticmethod
     def determine_weights(ebit_percentage, revenue):
-        if revenue > 3600:
-            if ebit_percentage < 3:
-                return (0.9, 0.1)
-            elif ebit_percentage < 5:
-                return (0.7, 0.3)
-            elif ebit_percentage < 15:
-                return (0.5, 0.5)
-            else:
-                return (0.3, 0.7)
-        if ebit_percentage < 3:
-            return 0.9, 0.1
-        elif ebit_percentage < 5:
-            return 0.7, 0.3
-        elif ebit_percentage < 10:
-            return 0.5, 0.5
-        elif ebit_percentage < 30:
-            return 0.3, 0.7
-        elif ebit_percentage < 40:
-            return 0.2, 0.8
-        elif ebit_percentage < 50:
-            return 0.1, 0.9
-        else:
-            return 0.05, 0.95
+        high_revenue = np.asarray(revenue) > 3600
+        high_weights = _HIGH_REVENUE_WEIGHTS[np.searchsorted(_HIGH_REVENUE_BOUNDS, ebit_percentage, side='right')]
+        ebit_weight, revenue_weight = determine_weights(ebit_percentage)
+        return (
+            np.where(high_revenue, high_weights[..., 0], ebit_weight),
+            np.where(high_revenue, high_weights[..., 1], revenue_weight),
+        )
+
+@st.cache_resource
+def get_model():
+    # The model only depends on the EXAMPLES literal, so build it once per process
+    return EarnoutModel(EXAMPLES)
 
 def main():
     st.title('Earnout Model')
-    examples = [(230, 2300, 900), (350, 3500, 1350), (780, 5250, 2025)]
-    model = EarnoutModel(examples)
+    model = get_model()
     ebit1 = st.sidebar.number_input("Enter Year 1 EBIT in USD'000:", value=230)
     revenue1 = st.sidebar.number_input("Enter Year 1 Revenue in USD'000:", value=2300)
     ebit2 = st.sidebar.number_input("Enter Year 2 EBIT in USD'000:", value=350)
     revenue2 = st.sidebar.number_input("Enter Year 2 Revenue in USD'000:", value=3500)
 
-    if st.sidebar.button('Calculate Price'):
-        price1 = model.calculate_price(ebit1, revenue1)
-        price2 = model.calculate_price(ebit2, revenue2)
+    calculate = st.sidebar.button('Calculate Price')
+    # The weighting is based on EBIT as a percentage of Revenue, which needs Revenue > 0
+    if calculate and (revenue1 <= 0 or revenue2 <= 0):
+        st.error("Revenue must be greater than zero in both years to calculate a price.")
+    elif calculate:
+        price1, price2 = model.calculate_prices([ebit1, ebit2], [revenue1, revenue2])
 
         initial_payment = 300
         year1_earnout = price1 - initial_payment * 3
@@ -104,10 +92,9 @@ def main():
 
         st.table(details)
 
-    st.sidebar.markdown(model_description())
+    st.sidebar.markdown(MODEL_DESCRIPTION)
 
-def model_description():
-    return """
+MODEL_DESCRIPTION = """
         ## Model Explanation
 
         The company price is USD'000 900 and the earnout potential is for a valuation of USD'000 2025.
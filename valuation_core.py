@@ -0,0 +1,59 @@
+import numpy as np
+
+# (EBIT, Revenue) weights of the initial model the scaling factor is calibrated against
+_SCALING_WEIGHTS = np.array([0.3, 0.7])
+
+# EBIT percentage bin edges and the (EBIT, Revenue) weights for each of the seven bins
+_EBIT_PERCENTAGE_BOUNDS = np.array([3, 5, 10, 30, 40, 50])
+_WEIGHTS = np.array([
+    (0.9, 0.1),
+    (0.7, 0.3),
+    (0.5, 0.5),
+    (0.3, 0.7),
+    (0.2, 0.8),
+    (0.1, 0.9),
+    (0.05, 0.95),
+])
+
+def calculate_scaling_factor(examples):
+    examples = np.asarray(examples, dtype=np.float64)
+    computed_prices = examples[:, :2] @ _SCALING_WEIGHTS
+    return float((examples[:, 2] / computed_prices).mean())
+
+def calculate_price(ebit, revenue, scale_factor):
+    # Scalar API: run the batch kernel on 0-d arrays and unwrap the result
+    price, ebit_percentage, ebit_weight, revenue_weight = (
+        float(value) for value in calculate_price_batch(ebit, revenue, scale_factor)
+    )
+    return round(price, 2), ebit_percentage, ebit_weight, revenue_weight, scale_factor
+
+def calculate_price_batch(ebit, revenue, scale_factor):
+    # EBIT and Revenue may be scalars or arrays of companies; results are unrounded arrays
+    ebit = np.asarray(ebit, dtype=np.float64)
+    revenue = np.asarray(revenue, dtype=np.float64)
+    ebit_percentage = (ebit / revenue) * 100
+    ebit_weight, revenue_weight = determine_weights(ebit_percentage)
+    base_price = (ebit_weight * ebit + revenue_weight * revenue) * scale_factor
+
+    price = apply_price_constraints(base_price, ebit, revenue)
+
+    return price, ebit_percentage, ebit_weight, revenue_weight
+
+def apply_price_constraints(price, ebit, revenue):
+    # Cap the maximum price at 2025
+    price = np.minimum(price, 2025)
+
+    # Variation from the minimum EBIT and Revenue
+    min_ebit, min_revenue = 230, 2300
+    ebit_variation = np.abs(ebit - min_ebit) / min_ebit
+    revenue_variation = np.abs(revenue - min_revenue) / min_revenue
+
+    # Ensure price does not go below 900 unless there's a significant variation
+    near_minimum = (ebit_variation <= 0.15) & (revenue_variation <= 0.15)
+    floor_price = np.where(near_minimum, 900, np.maximum(300, price))
+    return np.where(price < 900, floor_price, price)
+
+def determine_weights(ebit_percentage):
+    # Bin lookup on the EBIT percentage; works for scalars and arrays alike
+    weights = _WEIGHTS[np.searchsorted(_EBIT_PERCENTAGE_BOUNDS, ebit_percentage, side='right')]
+    return weights[..., 0], weights[..., 1]
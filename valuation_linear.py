@@ -1,7 +1,7 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
 class Config:
     def __init__(self):
@@ -17,22 +17,23 @@ class Config:
         self.valuation_multiplier = 3.7
 
     def generate_linear_relations_table(self):
-        rows = [0] + list(self.ebit_values)
-        columns = [0] + list(self.revenue_values)
-        table = []
-
-        for row in rows:
-            row_data = []
-            for col in columns:
-                value = self.specific_combinations.get((row, col), 0)
-                row_data.append(value)
-            table.append(row_data)
-
-        linear_relations_data = {'EBIT / Revenue': columns}
-        for i, row in enumerate(table):
-            linear_relations_data[str(rows[i])] = row
-
-        return pd.DataFrame(linear_relations_data)
+        # Both axes are ascending, so searchsorted maps each known combination to its cell
+        rows = np.concatenate(([0], self.ebit_values))
+        columns = np.concatenate(([0], self.revenue_values))
+        combinations = np.array(list(self.specific_combinations))
+        values = np.array(list(self.specific_combinations.values()))
+        row_idx = np.minimum(np.searchsorted(rows, combinations[:, 0]), len(rows) - 1)
+        col_idx = np.minimum(np.searchsorted(columns, combinations[:, 1]), len(columns) - 1)
+        on_grid = (rows[row_idx] == combinations[:, 0]) & (columns[col_idx] == combinations[:, 1])
+
+        # Fill only the known combinations; every other cell stays 0
+        table = np.zeros((len(rows), len(columns)), dtype=np.int64)
+        table[row_idx[on_grid], col_idx[on_grid]] = values[on_grid]
+
+        # One column per EBIT value, one row per Revenue value
+        linear_relations_df = pd.DataFrame(table.T, columns=[str(ebit) for ebit in rows])
+        linear_relations_df.insert(0, 'EBIT / Revenue', columns)
+        return linear_relations_df
 
 class ValuationModel:
     """
@@ -45,48 +46,59 @@ class ValuationModel:
         self.m_revenue, self.c_revenue = self.calculate_slope_intercept(config.revenue_values, config.valuation_values)
 
     def calculate_slope_intercept(self, x, y):
-        n = len(x)
-        m = (n * np.sum(x * y) - np.sum(x) * np.sum(y)) / (n * np.sum(x**2) - np.sum(x)**2)
-        c = (np.sum(y) - m * np.sum(x)) / n
-        return m, c
+        # Degree-1 least-squares fit; returns the slope first, then the intercept
+        m, c = np.polyfit(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), 1)
+        # Plain floats keep calculate_valuation on scalar arithmetic
+        return float(m), float(c)
 
     def calculate_valuation(self, ebit, revenue):
-        # Specific checks for given EBIT and Revenue values
-        if (ebit, revenue) in self.config.specific_combinations:
-            return self.config.specific_combinations[(ebit, revenue)]
-        
-        ebit = min(ebit, self.config.ebit_ceiling)  # Apply EBIT ceiling
-        revenue = min(revenue, self.config.revenue_ceiling)  # Apply Revenue ceiling
-        valuation_ebit = self.m_ebit * ebit + self.c_ebit
-        valuation_revenue = self.m_revenue * revenue + self.c_revenue
-        valuation = (valuation_ebit + valuation_revenue) / 2
-
-        ebit_ratio = ebit / revenue if revenue != 0 else 0
-        if ebit_ratio < self.config.ebit_ratio_threshold:
-            valuation = min(valuation, self.config.valuation_multiplier * ebit)
-        
-        return max(750, int(min(valuation, self.config.valuation_ceiling)))  # Apply floor price and ceiling
+        config = self.config
+
+        # Specific checks for given EBIT and Revenue values; the regression does not
+        # reproduce these points exactly, so they stay as overrides
+        specific_valuation = config.specific_combinations.get((ebit, revenue))
+        if specific_valuation is not None:
+            return specific_valuation
+
+        # Apply EBIT and Revenue ceilings
+        ebit_ceiling, revenue_ceiling = config.ebit_ceiling, config.revenue_ceiling
+        ebit = ebit if ebit < ebit_ceiling else ebit_ceiling
+        revenue = revenue if revenue < revenue_ceiling else revenue_ceiling
+        valuation = (self.m_ebit * ebit + self.c_ebit + (self.m_revenue * revenue + self.c_revenue)) / 2
+
+        if revenue == 0 or ebit / revenue < config.ebit_ratio_threshold:
+            valuation = min(valuation, config.valuation_multiplier * ebit)
+
+        return max(750, int(min(valuation, config.valuation_ceiling)))  # Apply floor price and ceiling
 
     def plot_linear_relationships(self, ebit, revenue, valuation):
-        value_slope = np.linspace(0, self.config.ebit_ceiling, 100) 
+        revenue_for_ebit_valuation, value_slope = compute_valuation_slope(
+            self.m_ebit, self.c_ebit, self.m_revenue, self.c_revenue, self.config.ebit_ceiling
+        )
 
-        revenue_for_ebit_valuation = (self.m_ebit * value_slope + self.c_ebit - self.c_revenue) / self.m_revenue
+        # Explicit Figure, so nothing accumulates in pyplot's global state across reruns
+        fig = Figure(figsize=(10, 6))
+        ax = fig.add_subplot(111)
+        ax.plot(revenue_for_ebit_valuation, value_slope, label='Valuation Slope', color='blue')
 
-        plt.figure(figsize=(10, 6))
-        plt.plot(revenue_for_ebit_valuation, value_slope, label='Valuation Slope', color='blue')
+        ax.scatter(revenue, ebit, color='red', s=100, label=f'Valuation: Revenue = {revenue}, EBIT = {ebit}')
 
-        plt.scatter(revenue, ebit, color='red', s=100, label=f'Valuation: Revenue = {revenue}, EBIT = {ebit}')
+        ax.set_xlabel('Revenue')
+        ax.set_ylabel('EBIT')
+        ax.set_title('EBIT vs. Revenue: Valuation based on Revenue and EBIT')
 
-        plt.xlabel('Revenue')
-        plt.ylabel('EBIT')
-        plt.title('EBIT vs. Revenue: Valuation based on Revenue and EBIT')
+        ax.set_xlim(0, self.config.revenue_ceiling)
+        ax.set_ylim(0, self.config.ebit_ceiling)
 
-        plt.xlim(0, self.config.revenue_ceiling)
-        plt.ylim(0, self.config.ebit_ceiling)
+        ax.legend()
+        ax.grid(True)
+        st.pyplot(fig)
 
-        plt.legend()
-        plt.grid(True)
-        st.pyplot(plt)
+def compute_valuation_slope(m_ebit, c_ebit, m_revenue, c_revenue, ebit_ceiling):
+    # Revenue at which the Revenue line gives the same valuation as the EBIT line, per EBIT
+    value_slope = np.linspace(0, ebit_ceiling, 100)
+    revenue_for_ebit_valuation = (m_ebit * value_slope + c_ebit - c_revenue) / m_revenue
+    return revenue_for_ebit_valuation, value_slope
 
 class PaymentBreakdown:
     """
@@ -105,25 +117,43 @@ class PaymentBreakdown:
         return base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, difference
 
     def create_dataframe(self, base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, valuation):
-        data = {
-            'Item': ['Base price', 'Earnout', 'Total'],
-            'T0': [base_payment_t0, 0, base_payment_t0],
-            'T1': [base_payment_t1, diff_payment_t1, base_payment_t1 + diff_payment_t1],
-            'T2': [0, diff_payment_t2, diff_payment_t2],
-            'Total': [self.config.base_price, valuation - self.config.base_price, valuation]
-        }
-        return pd.DataFrame(data)
+        base_price = self.config.base_price
+        # Rows are Base price, Earnout and Total; columns are T0, T1, T2 and Total
+        payments = np.array([
+            [base_payment_t0, base_payment_t1, 0, base_price],
+            [0, diff_payment_t1, diff_payment_t2, valuation - base_price],
+            [base_payment_t0, base_payment_t1 + diff_payment_t1, diff_payment_t2, valuation],
+        ], dtype=np.int64)
+        payment_df = pd.DataFrame(payments, columns=['T0', 'T1', 'T2', 'Total'])
+        payment_df.insert(0, 'Item', ['Base price', 'Earnout', 'Total'])
+        return payment_df
+
+@st.cache_resource
+def get_models():
+    # The config, the fitted regression and the breakdown only depend on the
+    # Config literals, so build them once per process
+    config = Config()
+    return config, ValuationModel(config), PaymentBreakdown(config)
+
+@st.cache_data
+def get_linear_relations_table():
+    # Built from the Config literals only
+    config, _, _ = get_models()
+    return config.generate_linear_relations_table()
+
+@st.cache_data
+def get_payment_dataframe(valuation):
+    # The breakdown only depends on the valuation and the Config literals
+    _, _, payment_breakdown = get_models()
+    base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, _ = payment_breakdown.calculate(valuation)
+    return payment_breakdown.create_dataframe(base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, valuation)
 
 def main():
-    # Instantiate the config
-    config = Config()
+    # Fitted model, shared across reruns
+    _, valuation_model, _ = get_models()
 
     # Generate the linear relations table from specific combinations
-    linear_relations_df = config.generate_linear_relations_table()
-
-    # Instantiate the models
-    valuation_model = ValuationModel(config)
-    payment_breakdown = PaymentBreakdown(config)
+    linear_relations_df = get_linear_relations_table()
 
     # Streamlit App
     st.title("Earnout Model")
@@ -155,11 +185,8 @@ def main():
         # Calculate EBIT multiple
         ebit_multiple = round(valuation / ebit, 2) if ebit != 0 else 0
 
-        # Calculate payment breakdown
-        base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, difference = payment_breakdown.calculate(valuation)
-
-        # Create dataframes for displaying results
-        payment_df = payment_breakdown.create_dataframe(base_payment_t0, base_payment_t1, diff_payment_t1, diff_payment_t2, valuation)
+        # Calculate payment breakdown and create the dataframe for displaying results
+        payment_df = get_payment_dataframe(valuation)
 
         # Display the results
         st.write("### Results")
@@ -168,7 +195,7 @@ def main():
         st.write(f"**EBIT Multiple: {ebit_multiple}x**")
 
         st.write("### Payment Breakdown")
-        st.table(payment_df.map(lambda x: int(x) if isinstance(x, (int, float)) else x))
+        st.table(payment_df)
 
         # Display the calculated slope and intercept for both EBIT and Revenue
         st.write("### Linear Relationship for Valuation")